@@ -1,13 +1,47 @@
 from lang import *
+from collections import defaultdict, deque
 from functools import reduce
 from abc import ABC, abstractmethod
 
 
+def ref_ids(bits):
+    """
+    Points-to sets are represented as integers used as bitsets: bit i is set
+    if the variable may point to ref_i, the memory location created by the
+    alloca instruction with ID i. This function enumerates the IDs of the
+    memory locations in a points-to set.
+
+    Example:
+        >>> list(ref_ids(0b1010))
+        [1, 3]
+    """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def refs_of(bits):
+    """
+    Converts a points-to bitset into the set of names of memory locations.
+
+    Example:
+        >>> sorted(refs_of(0b101))
+        ['ref_0', 'ref_2']
+    """
+    return {Storage.stc_loc_name(ref_id) for ref_id in ref_ids(bits)}
+
+
 class Edge():
     """
     This class implements the edge of the points-to graph that is used to
-    solve Andersen-style alias analysis.
+    solve Andersen-style alias analysis. Edge is the interface of the helper
+    functions below; abstract_interp keeps its edges as (dst, src) pairs of
+    integers instead. The helpers may create one edge per points-to relation
+    they discover, so edges use slots instead of a dict.
     """
+    __slots__ = ('src', 'dst')
+
     def __init__(self, dst, src):
         """
         An edge dst -> src indicates that every pointer in dst must be also
@@ -26,19 +60,35 @@ class Edge():
 
         Example:
             >>> e = Edge('a', 'b')
-            >>> env = {'a': {'ref_1'}, 'b': {'ref_0'}}
+            >>> env = {'a': 0b10, 'b': 0b01}
             >>> result = e.eval(env)
-            >>> f"{result}: {sorted(env['a'])}"
+            >>> f"{result}: {sorted(refs_of(env['a']))}"
             "True: ['ref_0', 'ref_1']"
         """
         # The points-to set of dst changes if the union of the points-to set of dst and src is different from the points-to set of dst.
-        # If the points-to set of dst changes, then we update the points-to set of dst with the union of the points-to set of dst and src.
-        # We return True if the points-to set of dst changes; otherwise, we return False.
-        if not env[self.dst].issuperset(env[self.src]):
-            env[self.dst] = env[self.src].union(env[self.dst])
-            return True
-        else:
+        # Points-to sets are bitsets, so the union is a bitwise or.
+        old = env[self.dst]
+        new = old | env[self.src]
+        if new == old:
             return False
+        env[self.dst] = new
+        return True
+
+    def __eq__(self, other):
+        """
+        Two edges are equal if they have the same endpoints. This lets the
+        points-to graph keep its edges in a set, and test membership in O(1).
+
+        Example:
+            >>> Edge('a', 'b') == Edge('a', 'b'), Edge('a', 'b') == Edge('b', 'a')
+            (True, False)
+            >>> len({Edge('a', 'b'), Edge('a', 'b')})
+            1
+        """
+        return isinstance(other, Edge) and other.dst == self.dst and other.src == self.src
+
+    def __hash__(self):
+        return hash((self.dst, self.src))
 
     def __str__(self):
         """
@@ -62,31 +112,27 @@ class Edge():
         """
         return str(self)
 
-def init_env(insts):
+def init_env(allocas):
     """
     Uses the basic constraints derived from alloca instructions to initialize
-    the environment.
+    the environment. Every instruction in allocas must be an Alloca.
 
     Example:
         >>> Inst.next_index = 0
         >>> i0 = Alloca('v')
         >>> i1 = Alloca('v')
         >>> i2 = Alloca('w')
-        >>> sorted(init_env([i0, i1, i2])['v'])
+        >>> sorted(refs_of(init_env([i0, i1, i2])['v']))
         ['ref_0', 'ref_1']
     """
-    # TODO: Implement this method.
     # env is a dictionary that maps variable names to the names of the references that the variable points to.
-    # we iterate over all the instructions in insts and, for each instruction of type Alloca, add a new reference to the points-to set of the variable.
-    # i0 = Alloca('v') -> v = alloca -> env = {'v': {'ref_0'}}
-    # i1 = Alloca('v') -> v = alloca -> env = {'v': {'ref_0', 'ref_1'}}
-    # i2 = Alloca('w') -> w = alloca -> env = {'v': {'ref_0', 'ref_1'}, 'w': {'ref_2'}}
+    # we iterate over all the alloca instructions and, for each one of them, add a new reference to the points-to set of the variable.
+    # i0 = Alloca('v') -> v = alloca -> env = {'v': {'ref_0'}} = {'v': 0b001}
+    # i1 = Alloca('v') -> v = alloca -> env = {'v': {'ref_0', 'ref_1'}} = {'v': 0b011}
+    # i2 = Alloca('w') -> w = alloca -> env = {'v': {'ref_0', 'ref_1'}, 'w': {'ref_2'}} = {'v': 0b011, 'w': 0b100}
     env = {}
-    for inst in insts:
-        if isinstance(inst, Alloca):
-            if inst.name not in env:
-                env[inst.name] = set()
-            env[inst.name].add(f"ref_{inst.ID}")
+    for inst in allocas:
+        env[inst.name] = env.get(inst.name, 0) | 1 << inst.ID
     return env
 
 
@@ -99,18 +145,17 @@ def propagate_alias_info(edges, env):
     Example:
         >>> e0 = Edge('b', 'a')
         >>> e1 = Edge('y', 'x')
-        >>> env = {'a': {'v0'}, 'x': {'v2'}}
+        >>> env = {'a': 0b001, 'x': 0b100}
         >>> changed = propagate_alias_info([e0, e1], env)
-        >>> f"{changed, env['y'], env['b']}"
-        "(True, {'v2'}, {'v0'})"
+        >>> f"{changed, refs_of(env['y']), refs_of(env['b'])}"
+        "(True, {'ref_2'}, {'ref_0'})"
 
         >>> e = Edge('b', 'a')
-        >>> env = {'a': {'v0'}, 'b': {'v0'}}
+        >>> env = {'a': 0b001, 'b': 0b001}
         >>> changed = propagate_alias_info([e], env)
-        >>> f"{changed, env['a'], env['b']}"
-        "(False, {'v0'}, {'v0'})"
+        >>> f"{changed, refs_of(env['a']), refs_of(env['b'])}"
+        "(False, {'ref_0'}, {'ref_0'})"
     """
-    # TODO: Implement this method.
     # If we have Edge ('b', 'a') so we have to copy all the elements of 'a' to 'b'
     # After calling propagate_alias_info([e0, e1], env), the function propagates the aliasing information
     # from 'a' to 'b' and from 'x' to 'y'. So, 'b' becomes an alias of 'v0' and 'y' becomes an alias of 'v2'.
@@ -120,102 +165,207 @@ def propagate_alias_info(edges, env):
     for edge in edges:
         # edge.eval(env) returns True if the points-to set of dst changes after the evaluation.
         if edge.dst not in env:
-            env[edge.dst] = set()
+            env[edge.dst] = 0
 
         if edge.eval(env):
             changed = True
     return changed
 
 
-def evaluate_st_constraints(insts, env):
+def evaluate_st_constraints(insts, env, edges, edge_set):
     """
     A store constraint is created by an instruction such as *ref = src. To
     evaluate a constraint like this, we do as follows: for each t in ref, we
     create a new edge src -> t. The result of evaluating this constraint is a
-    new set of edges. This function returns all the edges Edge(src, t), such
-    that t is in the points to set of ref.
+    new set of edges. This function appends to edges, the list of edges of
+    the points-to graph, every edge Edge(src, t), such that t is in the points
+    to set of ref, and returns True if any edge was appended.
+
+    edge_set holds the pairs (dst, src) of the edges already in edges, so
+    that a candidate edge is looked up before any Edge is built for it. This
+    function skips these edges, and the edges that would not change Alias(t) now, because
+    Alias(t) >= Alias(src) already. These edges are found again if the
+    constraint is evaluated once more after Alias(src) grows.
 
     Example:
         >>> Inst.next_index = 0
         >>> i0 = Store('b', 'a') # *b = a
-        >>> i1 = Store('y', 'x') # *y = x
-        >>> env = {'b': {'r'}, 'y': {'x', 's'}} #inst.ref = b, ref = r
-        >>> edges = evaluate_st_constraints([i0, i1], env)
+        >>> i1 = Store('y', 'ref_1') # *y = ref_1
+        >>> env = {'a': 0b1000, 'b': 0b001, 'y': 0b110, 'ref_1': 0b1000} # b -> {ref_0}, y -> {ref_1, ref_2}
+        >>> edges, edge_set = [], set()
+        >>> evaluate_st_constraints([i0, i1], env, edges, edge_set)
+        True
         >>> sorted([str(edge) for edge in edges])
-        ['Alias(r) >= Alias(a)', 'Alias(s) >= Alias(x)']
+        ['Alias(ref_0) >= Alias(a)', 'Alias(ref_2) >= Alias(ref_1)']
+        >>> evaluate_st_constraints([i0, i1], env, edges, edge_set)
+        False
+
+        >>> env = {'a': 0b1000, 'b': 0b001, 'y': 0b110, 'ref_1': 0b100, 'ref_2': 0b100}
+        >>> edges, edge_set = [], set()
+        >>> evaluate_st_constraints([i0, i1], env, edges, edge_set)
+        True
+        >>> [str(edge) for edge in edges]
+        ['Alias(ref_0) >= Alias(a)']
     """
-    # TODO: Implement this method.
     # *v = w: Stores the contents of w into the memory location referenced by v.
     # *v = w: For each reference t in v, we create a new edge w -> t.
     # The result of evaluating this constraint is a new set of edges.
-    # This function returns all the edges Edge(w, t), such that t is in the points-to set of v.
+    # This function adds all the edges Edge(w, t), such that t is in the points-to set of v.
     # In the example: i0 = Store('b', 'a') -> *b = a -> env = {'b': {'r'}, 'a': {'ref_0'}}
     # We have to create a new edge a -> r. It means that all the references in 'a' must be also in 'r'.
-    # So, the function returns [Edge('a', 'r')] -> ['Alias(r) >= Alias(a)'] (a now points to r)
-    edges = []
+    # So, the function adds Edge('a', 'r') -> 'Alias(r) >= Alias(a)' (a now points to r)
+    # The instruction fields and the points-to sets are read once per instruction, not once per reference.
+    added = False
+    out = edges.append
     for inst in insts:
-        #print("EVALUATING INST", inst)
         if isinstance(inst, Store):
-            if inst.src not in env:
-               # print("SRC NOT IN ENV, CREATING SET() FOR: ", inst.src)
-                env[inst.src] = set()
-            if inst.ref not in env:
-                #print("REF NOT IN ENV, CREATING SET() FOR: ", inst.ref)
-                env[inst.ref] = set()
-            for ref in env[inst.ref]:
-                if (inst.src != ref):
-                    #print("ADDING EDGE: ", Edge(inst.src, ref))
-                    edges.append(Edge(ref, inst.src))
-    return edges
-
-
-def evaluate_ld_constraints(insts, env):
+            src = inst.src
+            src_bits = env.setdefault(src, 0)
+            refs = env.setdefault(inst.ref, 0)
+            if not refs:
+                continue
+            for ref_id in ref_ids(refs):
+                ref = Storage.stc_loc_name(ref_id)
+                if src != ref:
+                    key = (ref, src)
+                    if key in edge_set or not src_bits & ~env.get(ref, 0):
+                        continue
+                    edge_set.add(key)
+                    out(Edge(ref, src))
+                    added = True
+    return added
+
+
+def evaluate_ld_constraints(insts, env, edges, edge_set):
     """
     A load constraint is created by an instruction such as dst = *ref. To
     evaluate a constraint like this, we do as follows: for each t in ref, we
     create a new edge t -> dst. The result of evaluating this constraint is a
-    new set of edges. This function, like evaluate_st_constraints, returns
-    the set of edges t -> dst, such that t is in th points-to set of ref.
+    new set of edges. This function, like evaluate_st_constraints, appends to
+    edges the edges t -> dst, such that t is in th points-to set of ref, and
+    returns True if any edge was appended. Edges are skipped as in
+    evaluate_st_constraints.
 
     Example:
         >>> Inst.next_index = 0
         >>> i0 = Load('b', 'a') # b = *a
-        >>> i1 = Load('y', 'x') # y = *x
-        >>> env = {'a': {'r'}, 'x': {'y', 's'}}
-        >>> edges = evaluate_ld_constraints([i0, i1], env)
+        >>> i1 = Load('ref_1', 'x') # ref_1 = *x
+        >>> env = {'a': 0b001, 'x': 0b110, 'ref_0': 0b1000, 'ref_2': 0b1000} # a -> {ref_0}, x -> {ref_1, ref_2}
+        >>> edges, edge_set = [], set()
+        >>> evaluate_ld_constraints([i0, i1], env, edges, edge_set)
+        True
         >>> sorted([str(edge) for edge in edges])
-        ['Alias(b) >= Alias(r)', 'Alias(y) >= Alias(s)']
+        ['Alias(b) >= Alias(ref_0)', 'Alias(ref_1) >= Alias(ref_2)']
+
+        >>> edges, edge_set = [], {('b', 'ref_0')}
+        >>> evaluate_ld_constraints([i0, i1], env, edges, edge_set)
+        True
+        >>> [str(edge) for edge in edges]
+        ['Alias(ref_1) >= Alias(ref_2)']
     """
-    # TODO: Implement this method.
     # v = *w: Loads the contents of the memory location referenced by w into v.
     # v = *w: For each reference t in w, we create a new edge t -> v.
     # The result of evaluating this constraint is a new set of edges.
-    # This function returns all the edges Edge(t, v), such that t is in the points-to set of w.
+    # This function adds all the edges Edge(t, v), such that t is in the points-to set of w.
     # In the example: i0 = Load('b', 'a') -> b = *a -> env = {'a': {'ref_0'}, 'b': {'r'}}
     # We have to create a new edge ref_0 -> r. It means that all the references in 'a' must be also in 'r'.
-    # So, the function returns [Edge('ref_0', 'r')] -> ['Alias(b) >= Alias(r)']
-    edges = []
+    # So, the function adds Edge('ref_0', 'r') -> 'Alias(b) >= Alias(r)'
+    added = False
+    out = edges.append
     for inst in insts:
         if isinstance(inst, Load):
-            if inst.dst not in env:
-                env[inst.dst] = set()
-            if inst.ref not in env:
-                env[inst.ref] = set()
-            for ref in env[inst.ref]:
-                if (inst.dst != ref):
-                    edges.append(Edge(inst.dst, ref))
-    return edges
+            dst = inst.dst
+            dst_bits = env.setdefault(dst, 0)
+            refs = env.setdefault(inst.ref, 0)
+            if not refs:
+                continue
+            for ref_id in ref_ids(refs):
+                ref = Storage.stc_loc_name(ref_id)
+                if dst != ref:
+                    key = (dst, ref)
+                    if key in edge_set or not env.get(ref, 0) & ~dst_bits:
+                        continue
+                    edge_set.add(key)
+                    out(Edge(dst, ref))
+                    added = True
+    return added
+
+
+def strongly_connected_components(num_nodes, succs):
+    """
+    Finds the strongly connected components of a graph whose nodes are the
+    integers 0 .. num_nodes - 1, and whose edges are given by succs, a map
+    from each node to the list of its successors. This function implements
+    Tarjan's algorithm, without recursion. The components are returned in
+    topological order: if there is an edge from a node in a component C0 to
+    a node in another component C1, then C0 comes before C1.
+
+    Example:
+        >>> succs = {0: [1], 1: [2], 2: [1, 3]}
+        >>> strongly_connected_components(4, succs)
+        [[0], [1, 2], [3]]
+    """
+    index = [None] * num_nodes
+    low = [0] * num_nodes
+    on_stack = [False] * num_nodes
+    stack = []
+    components = []
+    counter = 0
+    for root in range(num_nodes):
+        if index[root] is not None:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(succs.get(root, ())))]
+        while work:
+            node, children = work[-1]
+            for succ in children:
+                if index[succ] is None:
+                    index[succ] = low[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack[succ] = True
+                    work.append((succ, iter(succs.get(succ, ()))))
+                    break
+                if on_stack[succ]:
+                    low[node] = min(low[node], index[succ])
+            else:
+                # Every successor of node has been visited:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    component.sort()
+                    components.append(component)
+    # Tarjan's algorithm finds a component after all the components that it
+    # reaches, so the topological order is the reverse of the discovery order.
+    components.reverse()
+    return components
 
 
 def abstract_interp(insts):
     """
-    This function solves points-to analysis in four steps:
+    This function solves points-to analysis with a worklist:
     1. It creates an initial environment with the results of Allocas
-    2. It creates an initial points-to graph G with the Move instructions
-    3. It iterates the following three steps, while points-to data changes:
-       3.a: evaluate all the store constraints, maybe adding new edges to G.
-       3.b: evaluate all the load constraints, maybe adding new edges to G.
-       3.c: propagate points-to information along the edges of G.
+    2. It creates an initial points-to graph G with the Move instructions.
+       Variables in a cycle of G must have the same points-to set, so every
+       strongly connected component of G is collapsed into a single node.
+    3. It processes a worklist of variables whose points-to sets changed,
+       until the worklist is empty. When a variable v leaves the worklist:
+       3.a: evaluate the store constraints *v = w, maybe adding new edges to G.
+       3.b: evaluate the load constraints w = *v, maybe adding new edges to G.
+       3.c: propagate the points-to set of v along the edges of G leaving v.
+       Every variable whose points-to set grows goes back into the worklist.
 
     Example:
         >>> Inst.next_index = 0
@@ -229,56 +379,162 @@ def abstract_interp(insts):
         >>> env = abstract_interp([i0, i1, i2, i3, i4, i5, i6])
         >>> env['p0'], env['p1'], env['p2'], env['p3'], env['ref_0']
         ({'ref_0'}, {'ref_1'}, {'ref_1'}, {'ref_1'}, {'ref_1'})
-    """
-    # TODO: Implement this method.
 
-    # 1. Initializing the environment:
-    env = {}
-    env = init_env(insts)
-    #print("initial env;  ", env)
-
-    # 2. Build the initial graph of points-to relations:
-    edges = []
-    for inst in insts:
-        if isinstance(inst, Move):
-            edges.append(Edge(inst.dst, inst.src))
-    #for edge in edges:
-        #print("edges added after move:  ", edge)
-
-    # 3. Run iterations until we stabilize:
-    store_insts = []
-    load_insts = []
+    The analysis only stops once no new edge can be created and no points-to
+    set can grow. Below, every load depends on edges created by an earlier
+    store, and the instructions are listed in the reverse order:
+        >>> Inst.next_index = 0
+        >>> i0 = Alloca('p0')
+        >>> i1 = Alloca('p1')
+        >>> i2 = Alloca('p2')
+        >>> i3 = Move('p5', 'p4')
+        >>> i4 = Move('p4', 'p5')
+        >>> i5 = Load('p4', 'p3')
+        >>> i6 = Store('p3', 'p2')
+        >>> i7 = Load('p3', 'p0')
+        >>> i8 = Store('p0', 'p1')
+        >>> env = abstract_interp([i0, i1, i2, i3, i4, i5, i6, i7, i8])
+        >>> env['p3'], env['p4'], env['p5'], env['ref_0'], env['ref_1']
+        ({'ref_1'}, {'ref_2'}, {'ref_2'}, {'ref_1'}, {'ref_2'})
+    """
+    # Partition the instructions by kind in a single pass. Dispatching on the
+    # exact type is cheaper than a chain of isinstance tests.
+    allocas, moves, stores, loads = [], [], [], []
+    bucket = {Alloca: allocas, Move: moves, Store: stores, Load: loads}
     for inst in insts:
-        if isinstance(inst, Store):
-            store_insts.append(inst)
-        if isinstance(inst, Load):
-            load_insts.append(inst)
-
-
-    changed = True
-    while changed:
-        # 3.a: Evaluate all the complex constraints:
-        initial_edges = edges
-        new_st_edges = evaluate_st_constraints(store_insts, env)
-        for edge in new_st_edges:
-            if edge not in edges:
-                edges.append(edge)
-
-        new_ld_edges = evaluate_ld_constraints(load_insts, env)
-        for edge in new_ld_edges:
-            if edge not in edges:
-                edges.append(edge)
+        kind = bucket.get(type(inst))
+        if kind is not None:
+            kind.append(inst)
+
+    # Every name, be it a variable or a memory location, is interned into a
+    # small integer, which indexes the environment. Thus, the solver below
+    # works on lists instead of dictionaries keyed by strings.
+    # Once cycles are collapsed, rep maps each name to the representative of
+    # its strongly connected component, which holds its points-to set.
+    name_id = {}
+    id_name = []
+    env = []
+    rep = []
+
+    def intern(name):
+        var = name_id.get(name)
+        if var is None:
+            var = name_id[name] = len(id_name)
+            id_name.append(name)
+            env.append(0)
+            rep.append(var)
+        return rep[var]
 
-        if initial_edges == edges:
-            changed = False
-
-
-        # 3.b: Propagate the points-to information:
-        changed = propagate_alias_info(edges, env)
-        pass
-
-    for key in list(env.keys()):
-        if not env[key]:
-            del env[key]
-
-    return env
\ No newline at end of file
+    # 1. Initializing the environment:
+    for name, bits in init_env(allocas).items():
+        env[intern(name)] = bits
+
+    # 2. Build the initial graph of points-to relations, and collapse its
+    # cycles. The worklist starts with the representatives in topological
+    # order, so that most points-to sets are complete when they propagate.
+    move_succs = defaultdict(list)
+    for inst in moves:
+        move_succs[intern(inst.src)].append(intern(inst.dst))
+    order = []
+    for component in strongly_connected_components(len(env), move_succs):
+        leader = component[0]
+        for var in component[1:]:
+            rep[var] = leader
+            env[leader] |= env[var]
+        order.append(leader)
+
+    # The name of each memory location is built and interned only once; bit
+    # ref_id of a points-to set stands for the variable ref_var[ref_id].
+    ref_name = {inst.ID: Storage.stc_loc_name(inst.ID) for inst in allocas}
+    ref_var = {ref_id: intern(name) for ref_id, name in ref_name.items()}
+
+    # Edges are indexed by their source, so that we only visit the edges
+    # leaving a variable whose points-to set has changed. The edge_set avoids
+    # duplicate edges in O(1). Inside the solver, an edge is just the pair
+    # (dst, src) of interned names: no Edge object is needed. A new edge is
+    # evaluated once when it is created; from then on, it is evaluated again
+    # whenever the points-to set of its source grows.
+    edge_set = set()
+    edge_succs = defaultdict(list)
+    worklist = deque(order)
+    in_worklist = set(worklist)
+
+    def push(var):
+        if var not in in_worklist:
+            in_worklist.add(var)
+            worklist.append(var)
+
+    def add_edge(dst, src):
+        edge = (dst, src)
+        if edge in edge_set:
+            return
+        edge_set.add(edge)
+        edge_succs[src].append(dst)
+        old = env[dst]
+        new = old | env[src]
+        if new != old:
+            env[dst] = new
+            push(dst)
+
+    for inst in moves:
+        dst, src = intern(inst.dst), intern(inst.src)
+        if dst != src:
+            add_edge(dst, src)
+
+    # Store and load constraints are indexed by the variable they dereference.
+    # For *v = w we keep the source w; for w = *v we keep the destination w.
+    stores_by_ref = defaultdict(list)
+    loads_by_ref = defaultdict(list)
+    for inst in stores:
+        stores_by_ref[intern(inst.ref)].append(intern(inst.src))
+    for inst in loads:
+        loads_by_ref[intern(inst.ref)].append(intern(inst.dst))
+
+    # 3. Run the worklist until we stabilize. Every edge created by a store
+    # or a load is kept in G, so when v leaves the worklist we only need to
+    # evaluate these constraints for the locations that entered Alias(v)
+    # since v was last processed. done[v] records the locations already seen.
+    # Only variables that are dereferenced need this record.
+    derefs = stores_by_ref.keys() | loads_by_ref.keys()
+    done = dict.fromkeys(derefs, 0)
+
+    while worklist:
+        v = worklist.popleft()
+        in_worklist.discard(v)
+        if v in done:
+            # Edges evaluated below may grow Alias(v) itself; as bitsets are
+            # immutable, bits is a snapshot, and v goes back into the worklist.
+            bits = env[v]
+            new_bits = bits & ~done[v]
+            done[v] = bits
+            refs = [ref_var[ref_id] for ref_id in ref_ids(new_bits)]
+
+            # 3.a: *v = w creates the constraint Alias(t) >= Alias(w), t in Alias(v)
+            for src in stores_by_ref.get(v, ()):
+                for ref in refs:
+                    if ref != src:
+                        add_edge(ref, src)
+
+            # 3.b: w = *v creates the constraint Alias(w) >= Alias(t), t in Alias(v)
+            for dst in loads_by_ref.get(v, ()):
+                for ref in refs:
+                    if ref != dst:
+                        add_edge(dst, ref)
+
+        # 3.c: Propagate the points-to information along the edges leaving v.
+        # This is the innermost loop of the solver, so it works on the bitsets
+        # directly instead of going through Edge.eval.
+        bits = env[v]
+        for dst in edge_succs.get(v, ()):
+            old = env[dst]
+            new = old | bits
+            if new != old:
+                env[dst] = new
+                push(dst)
+
+    # Translate the interned names back into the names of the program,
+    # leaving out the names that point to nothing.
+    return {
+        name: {ref_name[ref_id] for ref_id in ref_ids(env[rep[var]])}
+        for var, name in enumerate(id_name) if env[rep[var]]
+    }